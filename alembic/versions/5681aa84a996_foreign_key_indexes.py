@@ -0,0 +1,42 @@
+"""foreign_key_indexes
+
+Revision ID: 5681aa84a996
+Revises: d5f02858953e
+Create Date: 2026-10-17 17:48:36.335578
+
+"""
+import sqlalchemy as sa
+import sqlmodel
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5681aa84a996"
+down_revision = "d5f02858953e"
+branch_labels = None
+depends_on = None
+
+# (index, table, column) for foreign keys and columns the routers filter on
+INDEXES = [
+    ("ix_education_owner_id", "education", "owner_id"),
+    ("ix_experience_owner_id", "experience", "owner_id"),
+    ("ix_profilephoto_owner_id", "profilephoto", "owner_id"),
+    ("ix_profilephoto_photo_url", "profilephoto", "photo_url"),
+    ("ix_userunilink_uni_id", "userunilink", "uni_id"),
+]
+
+
+def upgrade() -> None:
+    # built concurrently so writes to these tables aren't blocked meanwhile,
+    # which postgres only allows outside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name, table, [column], unique=False, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, column in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
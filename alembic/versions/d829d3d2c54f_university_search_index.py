@@ -0,0 +1,67 @@
+"""university_search_index
+
+Revision ID: d829d3d2c54f
+Revises: dfbd1cb227bc
+Create Date: 2026-10-17 09:12:31.482113
+
+"""
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d829d3d2c54f"
+down_revision = "dfbd1cb227bc"
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT = (
+    "name || ' ' || city || ' ' || state || ' ' || conference || ' ' || "
+    "division || ' ' || region || ' ' || category"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "university",
+        sa.Column(
+            "search_text",
+            sa.Text(),
+            sa.Computed(SEARCH_TEXT, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "university",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(f"to_tsvector('simple', {SEARCH_TEXT})", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_university_search_vector",
+        "university",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_university_search_text_trgm",
+        "university",
+        ["search_text"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"search_text": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_university_search_text_trgm", table_name="university")
+    op.drop_index("ix_university_search_vector", table_name="university")
+    op.drop_column("university", "search_vector")
+    op.drop_column("university", "search_text")
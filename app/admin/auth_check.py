@@ -1,9 +1,32 @@
 from functools import wraps
 
 from fastapi.responses import JSONResponse
-from sqlmodel import select
+from sqlmodel import Session, select
 
 from app import models
+from app.cache import TTLCache
+from app.config import settings
+
+# role by user id, so admin requests don't each spend a query on it
+_role_cache = TTLCache(
+    "roles", settings.role_cache_ttl, maxsize=settings.role_cache_size
+)
+
+
+def get_role(db: Session, user_id: str):
+    role = _role_cache.get(user_id)
+    if role is None:
+        role = db.exec(
+            select(models.User.role).where(models.User.id == user_id)
+        ).first()
+        if role is not None:  # don't remember users that don't exist yet
+            _role_cache.set(user_id, role)
+    return role
+
+
+def invalidate_role(user_id: str = None):
+    """Forget cached roles, for one user or everyone, after they change."""
+    _role_cache.invalidate(user_id)
 
 
 def auth_check(roles):
@@ -12,10 +35,7 @@ def auth_check(roles):
         def wrapper_auth(*args, **kwargs):
             session = kwargs["session"]
             db = kwargs["db"]
-            current_user = db.exec(
-                select(models.User).where(models.User.id == session.get_user_id())
-            ).first()
-            user_role = current_user.role
+            user_role = get_role(db, session.get_user_id())
             if user_role in roles:
                 return func(*args, **kwargs)
             return JSONResponse(status_code=403, content={"detail": "Unauthorized"})
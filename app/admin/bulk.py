@@ -0,0 +1,186 @@
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session
+
+from app import models, schemas
+from app.config import settings
+
+UNIVERSITY_COLUMNS = [
+    "name",
+    "city",
+    "state",
+    "conference",
+    "division",
+    "category",
+    "region",
+]
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _decoded_lines(upload: UploadFile):
+    try:
+        yield from codecs.iterdecode(upload.file, "utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploads must be UTF-8 encoded",
+        )
+
+
+def read_records(upload: UploadFile):
+    """Yield (row number, record, error) for each record of an upload.
+
+    CSV files need a header row; .jsonl/.ndjson files hold one JSON object
+    per line. The file is read a line at a time rather than all at once, and
+    one that isn't UTF-8 is rejected with a 400.
+    """
+    filename = (upload.filename or "").lower()
+    lines = _decoded_lines(upload)
+    if filename.endswith(".csv"):
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+    elif filename.endswith((".jsonl", ".ndjson")):
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line), None
+            except ValueError as e:
+                yield number, None, f"invalid JSON: {e}"
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload a .csv or .jsonl file",
+        )
+
+
+def _upsert_universities(db: Session, rows):
+    now = datetime.utcnow()
+    statement = insert(models.University).values(
+        [
+            {**row.dict(include=set(UNIVERSITY_COLUMNS)), "created_at": now}
+            for row in rows
+        ]
+    )
+    db.exec(
+        statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={column: statement.excluded[column] for column in UNIVERSITY_COLUMNS},
+        )
+    )
+    links = [{"name": row.name, "link": row.link} for row in rows if row.link]
+    if links:
+        statement = insert(models.UniversityLink).values(links)
+        db.exec(
+            statement.on_conflict_do_update(
+                index_elements=["name"], set_={"link": statement.excluded.link}
+            )
+        )
+
+
+def _import_batch(db: Session, batch: dict, errors: list):
+    rows = list(batch.values())
+    try:
+        with db.begin_nested():
+            _upsert_universities(db, [row for _, row in rows])
+        return len(rows)
+    except DBAPIError:
+        pass
+    # something in the batch was rejected, retry row by row to find it
+    imported = 0
+    for number, row in rows:
+        try:
+            with db.begin_nested():
+                _upsert_universities(db, [row])
+            imported += 1
+        except DBAPIError as e:
+            errors.append({"row": number, "errors": [str(e.orig).strip()]})
+    return imported
+
+
+def import_universities(db: Session, upload: UploadFile):
+    """Upsert universities, and their links, from a CSV or JSON Lines upload.
+
+    Rows are matched to existing universities by name and written with one
+    INSERT ... ON CONFLICT per batch of `import_batch_size`. Invalid rows are
+    skipped and reported, the rest are committed together.
+    """
+    imported = 0
+    errors = []
+    batch = {}
+    for number, record, error in read_records(upload):
+        if error is not None:
+            errors.append({"row": number, "errors": [error]})
+            continue
+        try:
+            row = schemas.UniversityImportRow.parse_obj(record)
+        except ValidationError as e:
+            errors.append(
+                {
+                    "row": number,
+                    "errors": [
+                        f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}"
+                        for detail in e.errors()
+                    ],
+                }
+            )
+            continue
+        # a name can only be upserted once per statement, the last row wins
+        batch[row.name] = (number, row)
+        if len(batch) >= settings.import_batch_size:
+            imported += _import_batch(db, batch, errors)
+            batch = {}
+    if batch:
+        imported += _import_batch(db, batch, errors)
+    db.commit()
+    return imported, errors
+
+
+def _export_lines(db: Session, statement, columns, format: str):
+    # dependencies are torn down only once the whole response is sent, so the
+    # request's session (and its connection) is still open while streaming
+    result = db.exec(statement.execution_options(stream_results=True))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(columns)
+    for rows in result.partitions(settings.export_batch_size):
+        for row in rows:
+            if format == "csv":
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_response(db: Session, statement, columns, format: str, filename: str):
+    """Stream the rows of `statement` as a CSV or NDJSON download.
+
+    Rows are fetched from a server side cursor on the request's session,
+    `export_batch_size` at a time, so memory stays flat however large the
+    table is.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be csv or ndjson",
+        )
+    return StreamingResponse(
+        _export_lines(db, statement, columns, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
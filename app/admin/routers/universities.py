@@ -1,15 +1,34 @@
-from typing import List, Union
-
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from typing import List, Optional, Union
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from fastapi_csrf_protect import CsrfProtect
-from sqlmodel import Session, or_, select
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
 from supertokens_python.recipe.session import SessionContainer
 from supertokens_python.recipe.session.framework.fastapi import verify_session
 
 from app import models, schemas
 from app.database import get_db
+from app.pagination import (
+    NEXT_CURSOR_HEADER,
+    clamp_limit,
+    count_total,
+    next_page,
+    paginate,
+)
+from app.search import search_universities
 
 from ..auth_check import auth_check
+from ..bulk import UNIVERSITY_COLUMNS, export_response, import_universities
 
 
 @CsrfProtect.load_config
@@ -19,6 +38,19 @@ def get_csrf_config():
 
 router = APIRouter(prefix="/admin/universities", tags=["(Admin) University"])
 
+
+def commit_university(db: Session, name: str):
+    # names are unique, see the university_name_key constraint
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"A university named {name} already exists",
+        )
+
+
 # helper needed due to how the postgresql dataprovider works for react-admin
 def get_university(university_id: int, db: Session):
     university = db.exec(
@@ -44,61 +76,79 @@ def get_universities(
     offset: int = 0,
     order: str = "id.asc",
     q: str = "",
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     session: SessionContainer = Depends(verify_session()),
 ):
     # Get one university
     if id != "-1":
         return get_university(int(id.split(".")[1]), db)
-    order_direction_map = {
-        "id": [models.University.id, models.University.id.desc()],
-        "name": [models.University.name, models.University.name.desc()],
-        "city": [models.University.city, models.University.city.desc()],
-        "state": [models.University.state, models.University.state.desc()],
-        "conference": [
-            models.University.conference,
-            models.University.conference.desc(),
-        ],
-        "division": [models.University.division, models.University.division.desc()],
-        "region": [models.University.region, models.University.region.desc()],
-        "category": [models.University.category, models.University.category.desc()],
+    order_columns = {
+        "id": models.University.id,
+        "name": models.University.name,
+        "city": models.University.city,
+        "state": models.University.state,
+        "conference": models.University.conference,
+        "division": models.University.division,
+        "region": models.University.region,
+        "category": models.University.category,
     }
 
     statement = select(models.University)
     if q != "":
         q = q.split(".")[1]
     order_column, order_direction = order.split(".")
-    if q != "":
-        statement = statement.where(
-            or_(
-                models.University.name.contains(q),
-                models.University.city.contains(q),
-                models.University.state.contains(q),
-                models.University.conference.contains(q),
-                models.University.division.contains(q),
-                models.University.region.contains(q),
-                models.University.category.contains(q),
-            )
-        )
-    total = len(db.exec(statement).all())
-    if order_direction == "asc":
-        statement = (
-            statement.order_by(order_direction_map[order_column][0])
-            .offset(offset)
-            .limit(limit)
-        )
-    else:
-        statement = (
-            statement.order_by(order_direction_map[order_column][1])
-            .offset(offset)
-            .limit(limit)
-        )
+    statement = search_universities(statement, q, rank=False)
+    total = count_total(db, statement, models.University, filtered=q != "")
+    limit = clamp_limit(limit)
+    statement = paginate(
+        statement,
+        order_columns[order_column],
+        models.University.id,
+        order_column,
+        limit,
+        offset=offset,
+        cursor=cursor,
+        descending=order_direction == "desc",
+    )
     results = db.exec(statement)
-    universities = results.all()
+    universities, next_cursor = next_page(results.all(), limit, order_column, cursor)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     response.headers["Content-Range"] = str(total)
     return universities
 
 
+@router.get("/export")
+@auth_check(roles=["admin"])
+def export_universities(
+    request: Request,
+    format: str = "csv",
+    q: str = "",
+    db: Session = Depends(get_db),
+    session: SessionContainer = Depends(verify_session()),
+):
+    if q != "":
+        q = q.split(".")[1]
+    # same columns the import endpoint reads, so an export can be re-imported
+    columns = ["id", *UNIVERSITY_COLUMNS, "link", "created_at"]
+    statement = (
+        select(
+            models.University.id,
+            *[getattr(models.University, column) for column in UNIVERSITY_COLUMNS],
+            models.UniversityLink.link,
+            models.University.created_at,
+        )
+        .outerjoin(
+            models.UniversityLink,
+            models.UniversityLink.name == models.University.name,
+        )
+        .order_by(models.University.id)
+    )
+    statement = search_universities(statement, q, rank=False)
+    return export_response(db, statement, columns, format, "universities")
+
+
 @router.post(
     "", status_code=status.HTTP_201_CREATED, response_model=schemas.UniversityRes
 )
@@ -114,11 +164,26 @@ def create_university(
     csrf_protect.validate_csrf(csrf_token, request)
     new_university = models.University(**university.dict())
     db.add(new_university)
-    db.commit()
+    commit_university(db, new_university.name)
     db.refresh(new_university)
     return new_university
 
 
+@router.post("/import", response_model=schemas.UniversityImportRes)
+@auth_check(roles=["admin"])
+def bulk_import_universities(
+    request: Request,
+    file: UploadFile,
+    db: Session = Depends(get_db),
+    session: SessionContainer = Depends(verify_session()),
+    csrf_protect: CsrfProtect = Depends(),
+):
+    csrf_token = csrf_protect.get_csrf_from_headers(request.headers)
+    csrf_protect.validate_csrf(csrf_token, request)
+    imported, errors = import_universities(db, file)
+    return {"imported": imported, "errors": errors}
+
+
 @router.put("", response_model=schemas.UniversityRes)
 @auth_check(roles=["admin"])
 def update_university(
@@ -145,7 +210,7 @@ def update_university(
     for key, value in updated_university_data.items():
         setattr(university, key, value)
     db.add(university)
-    db.commit()
+    commit_university(db, university.name)
     db.refresh(university)
     return university
 
@@ -165,16 +230,23 @@ def delete_university(
         university_ids = [int(id.split(".")[1])]
     elif "in" in id:  # delete many
         start = id.index("(") + 1
-        university_ids = [int(id) for id in id[start:-1].split(",")]
+        university_ids = list(dict.fromkeys(int(id) for id in id[start:-1].split(",")))
+    existing = set(
+        db.exec(
+            select(models.University.id).where(models.University.id.in_(university_ids))
+        ).all()
+    )
     for university_id in university_ids:
-        university = db.exec(
-            select(models.University).where(models.University.id == university_id)
-        ).first()
-        if university == None:
+        if university_id not in existing:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"University with id: {university_id} does not exist",
             )
-        db.delete(university)
-        db.commit()
+    # links to users go with them through ON DELETE CASCADE
+    db.exec(
+        delete(models.University)
+        .where(models.University.id.in_(university_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,13 +1,16 @@
-from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi_csrf_protect import CsrfProtect
+from sqlalchemy import delete
 from sqlmodel import Session, or_, select
 from supertokens_python.recipe.emailpassword.interfaces import (
     SignUpEmailAlreadyExistsError,
 )
 from supertokens_python.recipe.session import SessionContainer
 from supertokens_python.recipe.session.framework.fastapi import verify_session
+from supertokens_python.recipe.session.syncio import revoke_all_sessions_for_user
 from supertokens_python.recipe.thirdpartyemailpassword.syncio import (
     emailpassword_sign_up,
 )
@@ -16,9 +19,18 @@ from supertokens_python.syncio import (
 )  # not using async because aws lambda cannot handle
 
 from app import models, schemas
+from app.config import settings
 from app.database import get_db
+from app.pagination import (
+    NEXT_CURSOR_HEADER,
+    clamp_limit,
+    count_total,
+    next_page,
+    paginate,
+)
 
-from ..auth_check import auth_check
+from ..auth_check import auth_check, invalidate_role
+from ..bulk import export_response
 
 
 @CsrfProtect.load_config
@@ -40,6 +52,23 @@ def get_user(user_id: str, db: Session):
     return user
 
 
+def filter_users(statement, q: str):
+    if q == "":
+        return statement
+    return statement.where(
+        or_(
+            models.User.id.contains(q),
+            models.User.email.contains(q),
+            models.User.name.contains(q),
+            models.User.wechatId.contains(q),
+            models.User.gender.contains(q),
+            models.User.contact_number.contains(q),
+            models.User.current_address.contains(q),
+            models.User.role.contains(q),
+        )
+    )
+
+
 @router.get("", response_model=Union[List[schemas.UserAdmin], schemas.UserAdmin])
 @auth_check(roles=["admin"])
 def get_users(
@@ -50,67 +79,82 @@ def get_users(
     offset: int = 0,
     order: str = "id.asc",
     q: str = "",
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     session: SessionContainer = Depends(verify_session()),
 ):
     # Get one user
     if id != "-1":
         return get_user(id.split(".")[1], db)
-    order_direction_map = {
-        "id": [models.User.id, models.User.id.desc()],
-        "email": [models.User.email, models.User.email.desc()],
-        "name": [models.User.name, models.User.name.desc()],
-        "wechatId": [models.User.wechatId, models.User.wechatId.desc()],
-        "gender": [models.User.gender, models.User.gender.desc()],
-        "contact_number": [
-            models.User.contact_number,
-            models.User.contact_number.desc(),
-        ],
-        "current_address": [
-            models.User.current_address,
-            models.User.current_address.desc(),
-        ],
-        "birthday": [models.User.birthday, models.User.birthday.desc()],
-        "public": [models.User.public, models.User.public.desc()],
-        "role": [models.User.role, models.User.role.desc()],
+    order_columns = {
+        "id": models.User.id,
+        "email": models.User.email,
+        "name": models.User.name,
+        "wechatId": models.User.wechatId,
+        "gender": models.User.gender,
+        "contact_number": models.User.contact_number,
+        "current_address": models.User.current_address,
+        "birthday": models.User.birthday,
+        "public": models.User.public,
+        "role": models.User.role,
     }
 
     statement = select(models.User)
     if q != "":
         q = q.split(".")[1]
     order_column, order_direction = order.split(".")
-    if q != "":
-        statement = statement.where(
-            or_(
-                models.User.id.contains(q),
-                models.User.email.contains(q),
-                models.User.name.contains(q),
-                models.User.wechatId.contains(q),
-                models.User.gender.contains(q),
-                models.User.contact_number.contains(q),
-                models.User.current_address.contains(q),
-                models.User.role.contains(q),
-            )
-        )
-    total = len(db.exec(statement).all())
-    if order_direction == "asc":
-        statement = (
-            statement.order_by(order_direction_map[order_column][0])
-            .offset(offset)
-            .limit(limit)
-        )
-    else:
-        statement = (
-            statement.order_by(order_direction_map[order_column][1])
-            .offset(offset)
-            .limit(limit)
-        )
+    statement = filter_users(statement, q)
+    total = count_total(db, statement, models.User, filtered=q != "")
+    limit = clamp_limit(limit)
+    statement = paginate(
+        statement,
+        order_columns[order_column],
+        models.User.id,
+        order_column,
+        limit,
+        offset=offset,
+        cursor=cursor,
+        descending=order_direction == "desc",
+    )
     results = db.exec(statement)
-    users = results.all()
+    users, next_cursor = next_page(results.all(), limit, order_column, cursor)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     response.headers["Content-Range"] = str(total)
     return users
 
 
+@router.get("/export")
+@auth_check(roles=["admin"])
+def export_users(
+    request: Request,
+    format: str = "csv",
+    q: str = "",
+    db: Session = Depends(get_db),
+    session: SessionContainer = Depends(verify_session()),
+):
+    if q != "":
+        q = q.split(".")[1]
+    columns = [
+        "id",
+        "email",
+        "name",
+        "wechatId",
+        "gender",
+        "contact_number",
+        "current_address",
+        "birthday",
+        "public",
+        "role",
+        "created_at",
+    ]
+    statement = select(*[getattr(models.User, column) for column in columns]).order_by(
+        models.User.id
+    )
+    statement = filter_users(statement, q)
+    return export_response(db, statement, columns, format, "users")
+
+
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=schemas.UserAdmin)
 @auth_check(roles=["admin"])
 def create_user(
@@ -162,11 +206,17 @@ def update_user(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"The user does not exist"
         )
+    old_role = user.role
     updated_user_data = updated_user.dict(exclude_unset=True)
     for key, value in updated_user_data.items():
         setattr(user, key, value)
     db.add(user)
     db.commit()
+    if user.role != old_role:
+        invalidate_role(user_id)
+        if old_role == "admin":
+            # sign a demoted admin out everywhere
+            revoke_all_sessions_for_user(user_id)
     db.refresh(user)
     return user
 
@@ -186,15 +236,27 @@ def delete_user_(
         user_ids = [id.split(".")[1]]
     elif "in" in id:  # delete many
         start = id.index("(") + 1
-        user_ids = [id for id in id[start:-1].split(",")]
+        user_ids = list(dict.fromkeys(id[start:-1].split(",")))
+    existing = set(
+        db.exec(select(models.User.id).where(models.User.id.in_(user_ids))).all()
+    )
     for user_id in user_ids:
-        user = db.exec(select(models.User).where(models.User.id == user_id)).first()
-        if user == None:
+        if user_id not in existing:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"User with id: {user_id} does not exist",
             )
-        db.delete(user)
-        db.commit()
-        delete_user(user_id)
+    # profiles, photos and links go with them through ON DELETE CASCADE
+    db.exec(
+        delete(models.User)
+        .where(models.User.id.in_(user_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    for user_id in user_ids:
+        invalidate_role(user_id)
+    with ThreadPoolExecutor(
+        max_workers=min(len(user_ids), settings.supertokens_delete_workers)
+    ) as executor:
+        list(executor.map(delete_user, user_ids))
     return Response(status_code=status.HTTP_204_NO_CONTENT)
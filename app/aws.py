@@ -0,0 +1,65 @@
+import threading
+
+from .config import settings
+from .metrics import instrument_client
+from .tasks import task
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name: str):
+    """Shared boto3 client for an AWS service, created on first use.
+
+    Building a client resolves credentials and endpoints and opens a fresh
+    connection pool, so it is done once per container rather than per
+    request. Clients are thread safe once built; building them is not, hence
+    the lock.
+    """
+    # boto3 is slow to import and most requests never touch AWS
+    import boto3
+    from botocore.config import Config
+
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = boto3.client(
+                    service_name,
+                    region_name=settings.aws_region_,
+                    aws_access_key_id=settings.aws_access_key_id_,
+                    aws_secret_access_key=settings.aws_secret_access_key_,
+                    config=Config(
+                        max_pool_connections=settings.aws_max_pool_connections,
+                        # presigned s3 uploads must be SigV4 outside us-east-1
+                        signature_version="s3v4" if service_name == "s3" else None,
+                    ),
+                )
+                instrument_client(client)
+                _clients[service_name] = client
+    return client
+
+
+def object_url(key: str):
+    return f"https://{settings.s3_bucket_name}.s3.amazonaws.com/{key}"
+
+
+def object_exists(key: str):
+    from botocore.exceptions import ClientError  # see get_client
+
+    try:
+        get_client("s3").head_object(Bucket=settings.s3_bucket_name, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    return True
+
+
+@task
+def delete_s3_objects(keys: list):
+    get_client("s3").delete_objects(
+        Bucket=settings.s3_bucket_name,
+        Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+    )
@@ -22,6 +22,9 @@ class Settings(BaseSettings):
     s3_bucket_name: str
     aws_access_key_id_: str
     aws_secret_access_key_: str
+    aws_max_pool_connections: int = 10
+    profile_photo_max_bytes: int = 5 * 1024 * 1024
+    presigned_url_expiry: int = 300
 
     csrf_secret_key: str
     csrf_cookie_samesite: str
@@ -45,6 +48,45 @@ class Settings(BaseSettings):
 
     email_verification: str
 
+    # queue, null or single, defaults by environment. single allows exactly one
+    # checked out connection per engine (sync and async), so code running in a
+    # request or task must never open a second Session(engine) while one is in
+    # use: it would wait db_pool_timeout and fail
+    db_pool_mode: str = ""
+    db_pool_size: int = 5  # per process, split between the sync and async engines
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800
+    db_pool_timeout: int = 30
+    db_pool_pre_ping: bool = True
+
+    task_backend: str = ""  # thread or outbox, defaults by environment
+    task_workers: int = 4
+    task_max_attempts: int = 5
+    task_retry_backoff: float = 2.0
+    task_drain_batch_size: int = 20
+    task_lease: int = 900  # seconds a claimed task is hidden from other drains
+    task_poll_interval: float = 5.0
+
+    email_backend: str = "ses"  # or "fake" to keep messages in memory
+    ses_max_send_rate: float = 0  # messages a second, 0 asks SES for the quota
+    email_dispatch_batch_size: int = 50
+    email_max_attempts: int = 5
+
+    max_page_size: int = 100
+    count_mode: str = "exact"  # exact, cached or estimate
+    count_cache_ttl: int = 30
+    count_estimate_min_rows: int = 10000
+
+    role_cache_ttl: int = 60
+    role_cache_size: int = 1024
+    supertokens_delete_workers: int = 8
+    import_batch_size: int = 500
+    export_batch_size: int = 1000
+    index_audit_on_startup: bool = False
+    slow_request_ms: int = 500
+    metrics_backend: str = ""  # prometheus or emf, defaults by environment
+    metrics_namespace: str = "SportsConnect"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
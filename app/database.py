@@ -1,18 +1,98 @@
+import anyio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select, SelectOfScalar
 
 from .config import settings
+from .instrumentation import after_cursor_execute, before_cursor_execute, handle_error
+from .metrics import instrument_pool
 
 SelectOfScalar.inherit_cache = True
 Select.inherit_cache = True
 
-SQLMODEL_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
-engine = create_engine(SQLMODEL_DATABASE_URL)
+SQLMODEL_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+# lambda containers serve one request at a time, keep a single connection warm
+# (one per engine)
+DB_POOL_MODE = settings.db_pool_mode or (
+    "single" if settings.environment == "PROD" else "queue"
+)
+
+
+POOL_MODES = ("queue", "single", "null")
+# the sync and async engines each keep a pool, so the configured sizes are
+# split between them to stay within the connections budgeted per process
+ENGINES = 2
+
+
+def pool_options(mode: str):
+    # "null" hands pooling to pgbouncer / rds proxy (transaction mode)
+    if mode not in POOL_MODES:
+        raise ValueError(
+            f"Unknown db_pool_mode {mode!r}, expected one of {', '.join(POOL_MODES)}"
+        )
+    if mode == "null":
+        return {"poolclass": NullPool}
+    options = {
+        "pool_size": max(1, settings.db_pool_size // ENGINES),
+        "max_overflow": settings.db_max_overflow // ENGINES,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if mode == "single":  # no overflow, see the db_pool_mode setting
+        options["pool_size"] = 1
+        options["max_overflow"] = 0
+    return options
+
+
+engine = create_engine(SQLMODEL_DATABASE_URL, **pool_options(DB_POOL_MODE))
 # engine = create_engine(settings.database_url)
 
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+# asyncpg connections are bound to the event loop that opened them; uvicorn and
+# Mangum (asyncio.get_event_loop()) both keep one loop for the process
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(DB_POOL_MODE))
+
+# count every statement towards the request that ran it, see app.instrumentation
+for sync_engine in (engine, async_engine.sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+instrument_pool(engine, "sync")
+instrument_pool(async_engine.sync_engine, "async")
+
+
 def get_db():
     db = Session(engine)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    db = AsyncSession(async_engine, expire_on_commit=False)
+    try:
+        yield db
+    finally:
+        # this runs after the response is sent, when the supertokens middleware
+        # (a BaseHTTPMiddleware) cancels the request's tasks; unshielded, close
+        # is cut short and the connection is never returned to the pool
+        with anyio.CancelScope(shield=True):
+            await db.close()
+
+
+def pool_stats():
+    pool = engine.pool
+    if isinstance(pool, NullPool):
+        return {"mode": DB_POOL_MODE}
+    return {
+        "mode": DB_POOL_MODE,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
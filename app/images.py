@@ -0,0 +1,66 @@
+from io import BytesIO
+
+from sqlmodel import Session
+
+from . import models
+from .aws import get_client, object_url
+from .config import settings
+from .database import engine
+from .tasks import task
+
+# longest edge in pixels of each stored profile photo thumbnail
+THUMBNAIL_SIZES = {"small": 96, "medium": 256, "large": 640}
+
+# what can be uploaded directly: formats Pillow reads, and not svg, which is
+# served from the public bucket and may carry script
+PHOTO_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+
+
+def thumbnail_name(photo_name: str, size: str):
+    return f"{photo_name.rsplit('.', 1)[0]}_{size}.webp"
+
+
+def make_thumbnails(data: bytes):
+    from PIL import Image, ImageOps  # only needed by the thumbnail task
+
+    image = Image.open(BytesIO(data))
+    image = ImageOps.exif_transpose(image)  # phones store rotation in exif
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    thumbnails = {}
+    for size, edge in THUMBNAIL_SIZES.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail((edge, edge))
+        buffer = BytesIO()
+        thumbnail.save(buffer, format="WEBP", quality=80, method=4)
+        thumbnails[size] = buffer.getvalue()
+    return thumbnails
+
+
+@task
+def create_profile_photo_thumbnails(photo_id: int):
+    """Store resized WebP copies of a profile photo next to the original.
+
+    Runs as a background task with its own session, and records each
+    thumbnail's url on the ProfilePhoto row.
+    """
+    with Session(engine) as db:
+        profile_photo = db.get(models.ProfilePhoto, photo_id)
+        if profile_photo == None:  # replaced before we got to it
+            return
+        s3 = get_client("s3")
+        original = s3.get_object(
+            Bucket=settings.s3_bucket_name, Key=profile_photo.photo_name
+        )["Body"].read()
+        for size, data in make_thumbnails(original).items():
+            name = thumbnail_name(profile_photo.photo_name, size)
+            s3.put_object(
+                Bucket=settings.s3_bucket_name,
+                Key=name,
+                Body=data,
+                ContentType="image/webp",
+                CacheControl="public, max-age=31536000, immutable",
+            )
+            setattr(profile_photo, f"photo_url_{size}", object_url(name))
+        db.add(profile_photo)
+        db.commit()
@@ -0,0 +1,78 @@
+import logging
+import sys
+
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from . import models  # noqa: F401 registers the tables on SQLModel.metadata
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# columns of every plain (non partial) index in the current schema, in order
+INDEX_COLUMNS_QUERY = text(
+    """
+    SELECT t.relname, array_agg(a.attname ORDER BY k.ord)
+    FROM pg_index x
+    JOIN pg_class t ON t.oid = x.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    CROSS JOIN LATERAL unnest(x.indkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+    WHERE n.nspname = current_schema() AND x.indpred IS NULL
+    GROUP BY t.relname, x.indexrelid
+    """
+)
+
+
+def expected_indexes(metadata=SQLModel.metadata):
+    """(table, columns) that queries rely on being indexed.
+
+    That is every foreign key, so joins and ON DELETE CASCADE don't scan the
+    referencing table, and every column declared with `index=True`.
+    """
+    expected = set()
+    for table in metadata.sorted_tables:
+        for foreign_key in table.foreign_key_constraints:
+            expected.add(
+                (table.name, tuple(column.name for column in foreign_key.columns))
+            )
+        for column in table.columns:
+            if column.index:
+                expected.add((table.name, (column.name,)))
+    return sorted(expected)
+
+
+def find_missing_indexes(connection):
+    """Expected indexes with no index in the database starting with their columns."""
+    existing = {}
+    for table, columns in connection.execute(INDEX_COLUMNS_QUERY):
+        existing.setdefault(table, []).append(tuple(columns))
+    return [
+        (table, columns)
+        for table, columns in expected_indexes()
+        if not any(
+            index[: len(columns)] == columns for index in existing.get(table, [])
+        )
+    ]
+
+
+def log_missing_indexes():
+    with engine.connect() as connection:
+        missing = find_missing_indexes(connection)
+    for table, columns in missing:
+        logger.warning("No index on %s(%s)", table, ", ".join(columns))
+    return missing
+
+
+def main():
+    with engine.connect() as connection:
+        missing = find_missing_indexes(connection)
+    for table, columns in missing:
+        print(f"missing index: {table}({', '.join(columns)})")
+    if missing:
+        sys.exit(1)
+    print("all foreign keys and indexed columns are covered")
+
+
+if __name__ == "__main__":
+    main()
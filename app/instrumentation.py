@@ -0,0 +1,111 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """SQL statements run while handling one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement: str, duration: float):
+        self.queries += 1
+        self.db_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+
+# Set by QueryStatsMiddleware. The stats object itself is shared, so
+# statements run in the threadpool (sync routes) are counted as well.
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+def handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    start = context.connection.info.get("query_start") if context.connection else None
+    if start:
+        start.pop()
+
+
+class QueryStatsMiddleware:
+    """Report each request's query count and db time.
+
+    They are sent as a `Server-Timing` header, so they show in the browser's
+    network tab, and logged as JSON: at DEBUG normally, at WARNING with the
+    slowest statement once the request takes `slow_request_ms` or longer.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                    f"total;dur={elapsed:.1f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+            self.log(scope, status_code, stats, (time.perf_counter() - start) * 1000)
+
+    def log(self, scope, status_code: int, stats: RequestStats, duration_ms: float):
+        slow = duration_ms >= settings.slow_request_ms
+        level = logging.WARNING if slow else logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration_ms, 1),
+            "queries": stats.queries,
+            "db_ms": round(stats.db_time * 1000, 1),
+            "slowest_query_ms": round(stats.slowest_time * 1000, 1),
+            "slow": slow,
+        }
+        if slow:
+            record["slowest_query"] = (stats.slowest_statement or "")[:500]
+        logger.log(level, json.dumps(record))
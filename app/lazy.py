@@ -0,0 +1,28 @@
+import threading
+
+
+class LazyRoutersMiddleware:
+    """Call `include` to add routes the first time a path under `prefix` is hit.
+
+    Keeps rarely used routers, and whatever they import, out of the cold
+    start of every other request.
+    """
+
+    def __init__(self, app, prefix: str, include):
+        self.app = app
+        self.prefix = prefix
+        self.include = include
+        self.included = False
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.included
+            and scope["type"] == "http"
+            and scope["path"].startswith(self.prefix)
+        ):
+            with self._lock:
+                if not self.included:
+                    self.include()
+                    self.included = True
+        await self.app(scope, receive, send)
@@ -0,0 +1,23 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from . import models, schemas
+
+# Eager loads each response schema needs, so serialising it runs a fixed
+# number of queries instead of one lazy load per relationship. A user has at
+# most one profile photo, so it is joined; the lists are loaded with one IN
+# query each.
+USER_PROFILE_OPTIONS = [
+    joinedload(models.User.profile_photo),
+    selectinload(models.User.experiences),
+    selectinload(models.User.educations),
+    selectinload(models.User.unis),
+]
+
+LOADER_OPTIONS = {
+    schemas.UserRes: USER_PROFILE_OPTIONS,
+    schemas.UserMe: USER_PROFILE_OPTIONS,
+}
+
+
+def with_loaders(statement, schema):
+    return statement.options(*LOADER_OPTIONS.get(schema, []))
@@ -0,0 +1,232 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from . import models
+from .aws import get_client
+from .config import settings
+from .database import engine
+from .tasks import enqueue, every_drain, task
+
+CHARSET = "UTF-8"
+
+# SES errors that will fail the same way however often they are retried
+PERMANENT_ERRORS = {
+    "MessageRejected",
+    "MailFromDomainNotVerifiedException",
+    "ConfigurationSetDoesNotExistException",
+}
+
+
+class DispatchIncomplete(Exception):
+    """Raised so the dispatch task is retried with backoff."""
+
+
+class FakeSESClient:
+    """In-memory stand-in for the SES client, used when email_backend is "fake".
+
+    Sent messages are kept in `sent` so the outbox can be exercised offline.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_email(self, **kwargs):
+        with self._lock:
+            self.sent.append(kwargs)
+        return {"MessageId": f"fake-{uuid.uuid4()}"}
+
+    def get_send_quota(self):
+        return {
+            "Max24HourSend": 200.0,
+            "MaxSendRate": 1.0,
+            "SentLast24Hours": float(len(self.sent)),
+        }
+
+
+fake_ses = FakeSESClient()
+
+
+def get_ses_client():
+    if settings.email_backend == "fake":
+        return fake_ses
+    return get_client("ses")
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` calls a second, in bursts of up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                time.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.updated = time.monotonic()
+            self.tokens -= 1
+
+
+_limiter = None
+
+
+def get_rate_limiter(ses):
+    # the quota is per account, so it is only looked up once per container
+    global _limiter
+    if _limiter is None:
+        rate = settings.ses_max_send_rate or ses.get_send_quota()["MaxSendRate"]
+        _limiter = RateLimiter(rate)
+    return _limiter
+
+
+def contact_email(name: str, email: str, message: str):
+    SUBJECT = "Mail from SportsConnect Customer: {email}".format(email=email)
+    BODY_TEXT = "Customer name: {name}\n Customer email: {email}\n Customer message: {message}".format(
+        name=name, email=email, message=message
+    )
+    BODY_HTML = """<html>
+    <head></head>
+    <body>
+    <p>Customer name: {name}</p>
+    <p>Customer email: {email}</p>
+    <p>Customer message: {message}</p>
+    </body>
+    </html>""".format(
+        name=name, email=email, message=message
+    )
+    return models.EmailOutbox(
+        sender=settings.mail_from,
+        recipient=settings.mail_to,
+        subject=SUBJECT,
+        body_text=BODY_TEXT,
+        body_html=BODY_HTML,
+    )
+
+
+def send(ses, email: models.EmailOutbox):
+    return ses.send_email(
+        Destination={
+            "ToAddresses": [
+                email.recipient,
+            ],
+        },
+        Message={
+            "Body": {
+                "Html": {
+                    "Charset": CHARSET,
+                    "Data": email.body_html,
+                },
+                "Text": {
+                    "Charset": CHARSET,
+                    "Data": email.body_text,
+                },
+            },
+            "Subject": {
+                "Charset": CHARSET,
+                "Data": email.subject,
+            },
+        },
+        Source=email.sender,
+    )
+
+
+@task
+def dispatch_emails(limit: int = None):
+    """Send a batch of pending outbox emails through SES.
+
+    Rows are locked with SKIP LOCKED so concurrent dispatchers split the
+    outbox between them, and sends are paced to the SES sending rate. When
+    SES throttles us, or a send fails and should be tried again, the progress
+    so far is committed and the task raises so it is retried with backoff.
+    The same goes for connection errors and timeouts, which stop the batch
+    rather than lose the record of what was already sent. A full batch queues
+    another dispatch for the rest.
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    limit = limit or settings.email_dispatch_batch_size
+    ses = get_ses_client()
+    limiter = get_rate_limiter(ses)
+    stopped = None
+    retry = False
+    with Session(engine) as db:
+        statement = (
+            select(models.EmailOutbox)
+            .where(models.EmailOutbox.status == "pending")
+            .order_by(models.EmailOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        emails = db.exec(statement).all()
+        for email in emails:
+            limiter.acquire()
+            try:
+                response = send(ses, email)
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                email.last_error = repr(e)
+                if code == "Throttling":  # not this message's fault
+                    db.add(email)
+                    stopped = "SES is throttling sends"
+                    break
+                email.attempts += 1
+                if (
+                    code in PERMANENT_ERRORS
+                    or email.attempts >= settings.email_max_attempts
+                ):
+                    email.status = "failed"
+                else:
+                    retry = True
+            except BotoCoreError as e:  # couldn't reach SES, nor will the rest
+                email.last_error = repr(e)
+                db.add(email)
+                stopped = "SES could not be reached"
+                break
+            else:
+                email.attempts += 1
+                email.status = "sent"
+                email.message_id = response["MessageId"]
+                email.sent_at = datetime.utcnow()
+            db.add(email)
+        db.commit()
+    if stopped:
+        raise DispatchIncomplete(stopped)
+    if retry:
+        raise DispatchIncomplete("Some emails failed and will be retried")
+    if len(emails) == limit:
+        enqueue(dispatch_emails)
+
+
+@every_drain
+def queue_pending_dispatch():
+    """Queue a dispatch when emails are pending and none is queued.
+
+    The dispatch queued with each email gives up after `task_max_attempts`,
+    e.g. when SES throttles or is unreachable for a while; the scheduled
+    drain then picks the rest of the outbox up.
+    """
+    with Session(engine) as db:
+        pending = db.exec(
+            select(models.EmailOutbox.id)
+            .where(models.EmailOutbox.status == "pending")
+            .limit(1)
+        ).first()
+        queued = db.exec(
+            select(models.Task.id)
+            .where(models.Task.name == dispatch_emails.__name__)
+            .where(models.Task.status == "pending")
+            .limit(1)
+        ).first()
+    if pending is not None and queued is None:
+        enqueue(dispatch_emails)
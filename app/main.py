@@ -1,4 +1,3 @@
-import nest_asyncio
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -18,13 +17,21 @@ from supertokens_python.recipe import (
 )
 from supertokens_python.recipe.thirdpartyemailpassword import Google
 
-from .admin.routers import universities as admin_universities
-from .admin.routers import user as admin_user
+from .cache import cache_stats
 from .config import settings
+from .database import pool_stats
+from .instrumentation import QueryStatsMiddleware
+from .lazy import LazyRoutersMiddleware
+from .metrics import MetricsMiddleware, flush_emf, metrics_response
+from .pagination import NEXT_CURSOR_HEADER
 from .routers import auth, education, email, experience, universities, user
+from .tasks import drain
+from .warmup import is_warmup_event, warm_up
 
 if settings.environment == "PROD":
     app = FastAPI(openapi_url=None, redoc_url=None)
+    import nest_asyncio
+
     nest_asyncio.apply()  # lambda supertokens_python fix
     mode = "wsgi"
     recipe_list = [
@@ -86,11 +93,35 @@ def csrf_protect_exception_handler(request: Request, exc: CsrfProtectError):
 app.add_middleware(get_middleware())
 
 
+@app.on_event("startup")
+def audit_indexes():
+    # only logs, so a missing index never stops the app from starting
+    if settings.index_audit_on_startup:
+        from .index_audit import log_missing_indexes
+
+        log_missing_indexes()
+
+
 @app.get("/healthdata")
 def check_health():
     return {"health": "healthy (data)"}
 
 
+@app.get("/healthdata/caches")
+def check_caches():
+    return cache_stats()
+
+
+@app.get("/healthdata/pool")
+def check_pool():
+    return pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
+
 app.include_router(user.router)
 app.include_router(auth.router)
 app.include_router(email.router)
@@ -98,9 +129,24 @@ app.include_router(experience.router)
 app.include_router(education.router)
 app.include_router(universities.router)
 
+
 # admin routes
-app.include_router(admin_user.router)
-app.include_router(admin_universities.router)
+def include_admin_routers():
+    from .admin.routers import universities as admin_universities
+    from .admin.routers import user as admin_user
+
+    app.include_router(admin_user.router)
+    app.include_router(admin_universities.router)
+
+
+if settings.environment == "PROD":
+    # admins are a tiny share of the traffic, so lambda containers only
+    # import the admin routers once one of them is asked for
+    app.add_middleware(
+        LazyRoutersMiddleware, prefix="/admin", include=include_admin_routers
+    )
+else:
+    include_admin_routers()
 
 app.add_middleware(
     CORSMiddleware,
@@ -108,9 +154,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "PUT", "POST", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["Content-Range"]
+    expose_headers=["Content-Range", NEXT_CURSOR_HEADER]
     + ["fdi-version", "rid", "anti-csrf"]
     + get_all_cors_headers(),
 )
+app.add_middleware(MetricsMiddleware)
+# outermost, so the timing covers every other middleware too
+app.add_middleware(QueryStatsMiddleware)
+
+mangum_handler = Mangum(app)
+
 
-handler = Mangum(app)
+def handler(event, context):
+    try:
+        # scheduled invocations ({"task": "drain"}, see deploy.sh.example) run the
+        # background task outbox
+        if event.get("task") == "drain":
+            return {"drained": drain()}
+        # provisioned concurrency / warmer pings: do the cold work before users do
+        if is_warmup_event(event):
+            return {"warmup": warm_up()}
+        return mangum_handler(event, context)
+    finally:
+        flush_emf()
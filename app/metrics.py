@@ -0,0 +1,251 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+from starlette.responses import Response
+from starlette.routing import Match
+
+from .cache import cache_stats
+from .config import settings
+from .instrumentation import request_stats
+
+# A Lambda container can't be scraped, so there each invocation writes its
+# metrics to the log in CloudWatch embedded metric format instead
+METRICS_BACKEND = settings.metrics_backend or (
+    "emf" if settings.environment == "PROD" else "prometheus"
+)
+if METRICS_BACKEND not in ("prometheus", "emf"):
+    raise ValueError(
+        f"Unknown metrics_backend {METRICS_BACKEND!r}, expected prometheus or emf"
+    )
+
+if METRICS_BACKEND == "prometheus":
+    # not imported on Lambda, where it would only add to cold starts
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds",
+        "Time spent handling a request",
+        ["method", "route", "status"],
+    )
+    REQUESTS_IN_PROGRESS = Gauge(
+        "http_requests_in_progress", "Requests currently being handled"
+    )
+    POOL_CHECKOUT_WAIT = Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a connection from the pool",
+        ["engine"],
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+    )
+    AWS_CALL_LATENCY = Histogram(
+        "aws_call_duration_seconds",
+        "Time spent in boto3 calls, including retries",
+        ["service", "operation"],
+    )
+
+_emf_lock = threading.Lock()
+_emf_requests = defaultdict(lambda: defaultdict(list))
+_emf_aws_calls = defaultdict(list)
+
+
+def route_name(scope):
+    # the route template rather than the path, so ids don't become labels
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        prometheus = METRICS_BACKEND == "prometheus"
+        if prometheus:
+            REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            route = route_name(scope)
+            if prometheus:
+                REQUESTS_IN_PROGRESS.dec()
+                REQUEST_LATENCY.labels(scope["method"], route, status_code).observe(
+                    duration
+                )
+            else:
+                stats = request_stats.get()
+                with _emf_lock:
+                    values = _emf_requests[route]
+                    values["Latency"].append(duration * 1000)
+                    if stats is not None:
+                        values["Queries"].append(stats.queries)
+                        values["DbTime"].append(stats.db_time * 1000)
+                # written out per request, so nothing piles up when this isn't
+                # running behind the Lambda handler (which flushes as well)
+                flush_emf()
+
+
+def instrument_pool(engine, name: str):
+    """Time how long `engine` waits for a pooled connection.
+
+    SQLAlchemy has no event for the start of a checkout, so the pool's
+    connect is wrapped. `engine.dispose()` replaces the pool and drops this.
+    """
+    if METRICS_BACKEND != "prometheus":
+        return
+    pool = engine.pool
+    connect = pool.connect
+    wait = POOL_CHECKOUT_WAIT.labels(name)
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            wait.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+
+def _before_aws_call(context, **kwargs):
+    context["metrics_start"] = time.perf_counter()
+
+
+def _after_aws_call(model, context, **kwargs):
+    start = context.get("metrics_start")
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    service = model.service_model.service_name
+    if METRICS_BACKEND == "prometheus":
+        AWS_CALL_LATENCY.labels(service, model.name).observe(duration)
+    else:
+        with _emf_lock:
+            _emf_aws_calls[(service, model.name)].append(duration * 1000)
+
+
+def instrument_client(client):
+    client.meta.events.register("before-call.*.*", _before_aws_call)
+    client.meta.events.register("after-call.*.*", _after_aws_call)
+
+
+class StatsCollector:
+    """Pool and cache numbers, read when metrics are collected."""
+
+    def describe(self):
+        # nothing to check up front, and collecting now would import database
+        return []
+
+    def collect(self):
+        from .database import pool_stats  # database imports this module
+
+        pool = GaugeMetricFamily(
+            "db_pool_connections", "Connections in the pool", labels=["state"]
+        )
+        for state, value in pool_stats().items():
+            if state != "mode":
+                pool.add_metric([state], value)
+        yield pool
+
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily(
+            "cache_hit_ratio", "Share of cache lookups that hit", labels=["cache"]
+        )
+        size = GaugeMetricFamily("cache_size", "Entries in the cache", labels=["cache"])
+        for name, stats in cache_stats().items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hit_rate"])
+            size.add_metric([name], stats["size"])
+        yield from (hits, misses, ratio, size)
+
+
+if METRICS_BACKEND == "prometheus":
+    REGISTRY.register(StatsCollector())
+
+
+def metrics_response():
+    if METRICS_BACKEND != "prometheus":
+        return Response(status_code=404)
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+def _emf_document(dimensions: dict, metrics: dict, units: dict):
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": settings.metrics_namespace,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [
+                        {"Name": name, "Unit": units[name]} for name in metrics
+                    ],
+                }
+            ],
+        },
+        **dimensions,
+        **metrics,
+    }
+
+
+def flush_emf():
+    """Print the metrics collected since the last flush as CloudWatch EMF log lines."""
+    if METRICS_BACKEND != "emf":
+        return
+    with _emf_lock:
+        requests = dict(_emf_requests)
+        aws_calls = dict(_emf_aws_calls)
+        _emf_requests.clear()
+        _emf_aws_calls.clear()
+    units = {
+        "Latency": "Milliseconds",
+        "Queries": "Count",
+        "DbTime": "Milliseconds",
+        "CacheHitRatio": "None",
+    }
+    for route, values in requests.items():
+        print(json.dumps(_emf_document({"Route": route}, dict(values), units)))
+    for (service, operation), durations in aws_calls.items():
+        print(
+            json.dumps(
+                _emf_document(
+                    {"Service": service, "Operation": operation},
+                    {"Latency": durations},
+                    units,
+                )
+            )
+        )
+    for name, stats in cache_stats().items():
+        if stats["hits"] + stats["misses"]:
+            print(
+                json.dumps(
+                    _emf_document(
+                        {"Cache": name}, {"CacheHitRatio": stats["hit_rate"]}, units
+                    )
+                )
+            )
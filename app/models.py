@@ -1,14 +1,40 @@
 from datetime import date, datetime
 from typing import List, Optional
 
+from sqlalchemy import JSON, Column, Computed, Index, Text, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlmodel import Field, Relationship, SQLModel
 
+# Columns covered by university search, concatenated into a generated column
+UNIVERSITY_SEARCH_COLUMNS = [
+    "name",
+    "city",
+    "state",
+    "conference",
+    "division",
+    "region",
+    "category",
+]
+UNIVERSITY_SEARCH_TEXT = " || ' ' || ".join(UNIVERSITY_SEARCH_COLUMNS)
+# generated by postgres, never written by the app, and deferred (see
+# University.__mapper_args__) as only search filters and ranks on them
+university_search_text = Column(
+    "search_text", Text, Computed(UNIVERSITY_SEARCH_TEXT, persisted=True)
+)
+university_search_vector = Column(
+    "search_vector",
+    TSVECTOR,
+    Computed(f"to_tsvector('simple', {UNIVERSITY_SEARCH_TEXT})", persisted=True),
+)
+
 
 # Represents the interest of player(s) in uni(s)
 class UserUniLink(SQLModel, table=True):
     user_id: str = Field(foreign_key="user.id", primary_key=True, nullable=False)
+    # user_id is covered by the primary key, uni_id needs its own index
     uni_id: Optional[int] = Field(
-        foreign_key="university.id", primary_key=True, nullable=False
+        foreign_key="university.id", primary_key=True, nullable=False, index=True
     )
 
 
@@ -47,7 +73,7 @@ class User(SQLModel, table=True):
 class Experience(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True, nullable=False)
     description: str = Field(nullable=False, max_length=100)
-    owner_id: str = Field(nullable=False, foreign_key="user.id")
+    owner_id: str = Field(nullable=False, foreign_key="user.id", index=True)
     created_at: datetime = Field(default=datetime.utcnow(), nullable=False)
     active: bool = Field(default=False, nullable=True)
     start_date: date = Field(nullable=False)
@@ -58,7 +84,7 @@ class Experience(SQLModel, table=True):
 class Education(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True, nullable=False)
     description: str = Field(nullable=False, max_length=100)
-    owner_id: str = Field(nullable=False, foreign_key="user.id")
+    owner_id: str = Field(nullable=False, foreign_key="user.id", index=True)
     created_at: datetime = Field(default=datetime.utcnow(), nullable=False)
     active: bool = Field(default=False, nullable=True)
     start_date: date = Field(nullable=False)
@@ -68,7 +94,7 @@ class Education(SQLModel, table=True):
 
 class University(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True, nullable=False)
-    name: str = Field(nullable=False, max_length=100)
+    name: str = Field(nullable=False, max_length=100, unique=True)
     city: str = Field(nullable=False, max_length=100)
     state: str = Field(nullable=False, max_length=100)
     conference: str = Field(nullable=False, max_length=100)
@@ -79,18 +105,86 @@ class University(SQLModel, table=True):
     interested_users: Optional[List["User"]] = Relationship(
         back_populates="unis", link_model=UserUniLink
     )
+    search_text: Optional[str] = Field(default=None, sa_column=university_search_text)
+    search_vector: Optional[str] = Field(
+        default=None, sa_column=university_search_vector
+    )
+
+    # not loaded with every university, only when accessed
+    __mapper_args__ = {
+        "properties": {
+            "search_text": deferred(university_search_text),
+            "search_vector": deferred(university_search_vector),
+        }
+    }
+    __table_args__ = (
+        Index("ix_university_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_university_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
+    )
 
 
 class ProfilePhoto(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True, nullable=False)
     photo_name: str = Field(nullable=False)
-    photo_url: str = Field(nullable=False)
+    photo_url: str = Field(nullable=False, index=True)
+    # resized webp copies, filled in after upload
+    photo_url_small: Optional[str] = Field(default=None, nullable=True)
+    photo_url_medium: Optional[str] = Field(default=None, nullable=True)
+    photo_url_large: Optional[str] = Field(default=None, nullable=True)
     is_deleted: bool = Field(default=False, nullable=True)
-    owner_id: str = Field(nullable=False, foreign_key="user.id")
+    owner_id: str = Field(nullable=False, foreign_key="user.id", index=True)
     owner: User = Relationship(back_populates="profile_photo")
 
 
 class UniversityLink(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True, nullable=False)
-    name: str = Field(nullable=False, max_length=100)
+    name: str = Field(nullable=False, max_length=100, unique=True)
     link: str = Field(nullable=False, max_length=100)
+
+
+# Outbox of background tasks, see app.tasks
+class Task(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True, nullable=False)
+    name: str = Field(nullable=False, max_length=100)
+    payload: dict = Field(default={}, sa_column=Column(JSON, nullable=False))
+    status: str = Field(default="pending", nullable=False, max_length=20)
+    attempts: int = Field(default=0, nullable=False)
+    last_error: Optional[str] = Field(default=None, nullable=True)
+    run_after: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_task_pending",
+            "run_after",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+
+class EmailOutbox(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True, nullable=False)
+    sender: str = Field(nullable=False)
+    recipient: str = Field(nullable=False)
+    subject: str = Field(nullable=False)
+    body_text: str = Field(nullable=False)
+    body_html: str = Field(nullable=False)
+    status: str = Field(default="pending", nullable=False, max_length=20)
+    attempts: int = Field(default=0, nullable=False)
+    last_error: Optional[str] = Field(default=None, nullable=True)
+    message_id: Optional[str] = Field(default=None, nullable=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    sent_at: Optional[datetime] = Field(default=None, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_emailoutbox_pending",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
@@ -0,0 +1,138 @@
+import base64
+import binascii
+import json
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_, text
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .cache import TTLCache
+from .config import settings
+
+NEXT_CURSOR_HEADER = "Next-Cursor"
+
+_count_cache = TTLCache("counts", ttl=settings.count_cache_ttl)
+
+
+def clamp_limit(limit: int):
+    # -1 used to mean "everything", it now means "as much as allowed"
+    if limit < 1 or limit > settings.max_page_size:
+        return settings.max_page_size
+    return limit
+
+
+def encode_cursor(order_key: str, value, id):
+    payload = json.dumps([order_key, value, id], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str, order_key: str):
+    try:
+        key, value, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    if key != order_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match the requested order",
+        )
+    return value, id
+
+
+def _seek(column, id_column, value, id, descending: bool):
+    # postgres sorts NULLs last ascending and first descending
+    if column is id_column:
+        return id_column < id if descending else id_column > id
+    if descending:
+        if value is None:
+            return or_(column.is_not(None), and_(column.is_(None), id_column < id))
+        return or_(column < value, and_(column == value, id_column < id))
+    if value is None:
+        return and_(column.is_(None), id_column > id)
+    return or_(column > value, and_(column == value, id_column > id), column.is_(None))
+
+
+def paginate(
+    statement,
+    column,
+    id_column,
+    order_key: str,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+):
+    """Order and limit a list statement.
+
+    Without a cursor this is plain offset pagination. With a cursor (an empty
+    one for the first page) rows are sought past the last row of the previous
+    page on (column, id), so every page costs the same. One extra row is
+    fetched so `next_page` can tell whether another page exists.
+    """
+    if column is id_column:
+        statement = statement.order_by(
+            id_column.desc() if descending else id_column.asc()
+        )
+    elif descending:
+        statement = statement.order_by(column.desc(), id_column.desc())
+    else:
+        statement = statement.order_by(column.asc(), id_column.asc())
+    if cursor is None:
+        return statement.offset(offset).limit(limit)
+    if cursor != "":
+        value, id = decode_cursor(cursor, order_key)
+        statement = statement.where(_seek(column, id_column, value, id, descending))
+    return statement.limit(limit + 1)
+
+
+def next_page(rows, limit: int, order_key: str, cursor: Optional[str] = None):
+    """Trim the look-ahead row and build the cursor of the next page, if any."""
+    if cursor is None or len(rows) <= limit:
+        return rows[:limit], None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(order_key, getattr(last, order_key), last.id)
+
+
+def count_statement(statement):
+    subquery = statement.order_by(None).offset(None).limit(None).subquery()
+    return select(func.count()).select_from(subquery)
+
+
+def count(db: Session, statement):
+    """SELECT count(*) over the same filtered statement, without loading any rows."""
+    return db.exec(count_statement(statement)).one()
+
+
+async def count_async(db: AsyncSession, statement):
+    return (await db.exec(count_statement(statement))).one()
+
+
+def _estimate_count(db: Session, table_name: str):
+    return db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": f'"{table_name}"'},
+    ).scalar()
+
+
+def count_total(db: Session, statement, model, filtered: bool):
+    """Total for a list's Content-Range header.
+
+    Filtered listings are always counted exactly. Unfiltered ones follow
+    `settings.count_mode`: "exact", "cached" (exact, reused for
+    `count_cache_ttl` seconds) or "estimate" (the planner's `pg_class.reltuples`,
+    falling back to an exact count for tables below `count_estimate_min_rows`).
+    """
+    if filtered or settings.count_mode == "exact":
+        return count(db, statement)
+    table_name = model.__tablename__
+    if settings.count_mode == "estimate":
+        estimate = _estimate_count(db, table_name)
+        if estimate is not None and estimate >= settings.count_estimate_min_rows:
+            return estimate
+        return count(db, statement)
+    return _count_cache.get_or_set(table_name, lambda: count(db, statement))
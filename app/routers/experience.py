@@ -3,12 +3,14 @@ from typing import List
 from fastapi import (APIRouter, Depends, HTTPException, Request, Response,
                      status)
 from fastapi_csrf_protect import CsrfProtect
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from supertokens_python.recipe.session import SessionContainer
 from supertokens_python.recipe.session.framework.fastapi import verify_session
 
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_async_db, get_db
 
 
 @CsrfProtect.load_config
@@ -20,14 +22,14 @@ router = APIRouter(prefix="/experiences", tags=["Experience"])
 
 
 @router.get("", response_model=List[schemas.ExperienceRes])
-def get_experiences(
-    db: Session = Depends(get_db),
+async def get_experiences(
+    db: AsyncSession = Depends(get_async_db),
     session: SessionContainer = Depends(verify_session()),
 ):
     statement = select(models.Experience).where(
         models.Experience.owner_id == session.get_user_id()
     )
-    results = db.exec(statement)
+    results = await db.exec(statement)
     experiences = results.all()
     return experiences
 
@@ -130,13 +132,16 @@ def update_experience(
 
 
 @router.get("/user/{user_id}", response_model=List[schemas.ExperienceRes])
-def get_experiences_for_user(user_id: str, db: Session = Depends(get_db)):
+async def get_experiences_for_user(
+    user_id: str, db: AsyncSession = Depends(get_async_db)
+):
     statement = (
         select(models.User)
         .where(models.User.id == user_id)
         .where(models.User.public == True)
+        .options(selectinload(models.User.experiences))
     )
-    results = db.exec(statement)
+    results = await db.exec(statement)
     user = results.first()
     if user == None:
         raise HTTPException(
@@ -1,129 +1,136 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, or_, select
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import literal
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from supertokens_python.recipe.session import SessionContainer
 from supertokens_python.recipe.session.framework.fastapi import verify_session
 
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_async_db
+from ..pagination import (
+    NEXT_CURSOR_HEADER,
+    clamp_limit,
+    count_async,
+    next_page,
+    paginate,
+)
+from ..search import search_universities
 
 router = APIRouter(prefix="/universities", tags=["Universities"])
 
 
-def get_unilinks(db: Session = Depends(get_db)):
-    statement = select(models.UniversityLink)
-    results = db.exec(statement).all()
-    unilinks = [unilink.dict() for unilink in results]
-    uni_link_map = {}
-    for unilink in unilinks:
-        uni_link_map[unilink["name"]] = unilink["link"]
-    return uni_link_map
+def select_universities_with_link(interested):
+    # rows map straight onto schemas.UniversityResWithLink, link is NULL if missing
+    return select(
+        models.University.id,
+        models.University.name,
+        models.University.city,
+        models.University.state,
+        models.University.conference,
+        models.University.division,
+        models.University.region,
+        models.University.category,
+        models.UniversityLink.link,
+        interested.label("interested"),
+    ).outerjoin(
+        models.UniversityLink, models.UniversityLink.name == models.University.name
+    )
+
+
+def interested_in(user_id: str):
+    return (
+        select(models.UserUniLink.uni_id)
+        .where(models.UserUniLink.uni_id == models.University.id)
+        .where(models.UserUniLink.user_id == user_id)
+        .exists()
+    )
+
+
+def list_universities_statement(
+    interested, search: str, limit: int, skip: int, cursor: Optional[str]
+):
+    statement = select_universities_with_link(interested)
+    statement = search_universities(statement, search, rank=cursor is None)
+    return paginate(
+        statement,
+        models.University.id,
+        models.University.id,
+        "id",
+        limit,
+        offset=skip,
+        cursor=cursor,
+    )
 
 
 @router.get("/public", response_model=List[schemas.UniversityResWithLink])
-def get_universities(
-    db: Session = Depends(get_db),
+async def get_universities(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = 10,
     skip: int = 0,
     search: Optional[str] = "",
+    cursor: Optional[str] = None,
 ):
-    statement = select(models.University)
-    if search != "":
-        statement = statement.where(
-            or_(
-                models.University.name.contains(search),
-                models.University.city.contains(search),
-                models.University.state.contains(search),
-                models.University.conference.contains(search),
-                models.University.division.contains(search),
-                models.University.region.contains(search),
-                models.University.category.contains(search),
-            )
-        )
-    if limit == -1:
-        statement = statement.offset(skip)
-    else:
-        statement = statement.offset(skip).limit(limit)
-    results = db.exec(statement)
-    all_universities = results.all()
-    uni_link_map = get_unilinks(db)
-    all_universities_plus_interest_field = []
-    for uni in all_universities:
-        uni_plus_interest = uni.dict()
-        uni_plus_interest["interested"] = False
-        uni_plus_interest["link"] = uni_link_map[uni_plus_interest["name"]]
-        all_universities_plus_interest_field.append(uni_plus_interest)
-    return all_universities_plus_interest_field
+    limit = clamp_limit(limit)
+    statement = list_universities_statement(literal(False), search, limit, skip, cursor)
+    results = await db.exec(statement)
+    universities, next_cursor = next_page(results.all(), limit, "id", cursor)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return universities
 
 
 @router.get("", response_model=List[schemas.UniversityResWithLink])
-def get_universities(
-    db: Session = Depends(get_db),
+async def get_universities(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = 10,
     skip: int = 0,
     search: Optional[str] = "",
+    cursor: Optional[str] = None,
     session: SessionContainer = Depends(verify_session()),
 ):
-    statement = select(models.University)
-    if search != "":
-        statement = statement.where(
-            or_(
-                models.University.name.contains(search),
-                models.University.city.contains(search),
-                models.University.state.contains(search),
-                models.University.conference.contains(search),
-                models.University.division.contains(search),
-                models.University.region.contains(search),
-                models.University.category.contains(search),
-            )
-        )
-    if limit == -1:
-        statement = statement.offset(skip)
-    else:
-        statement = statement.offset(skip).limit(limit)
-    results = db.exec(statement)
-    all_universities = results.all()
-    my_interested_uni_ids = set(
-        uni.id
-        for uni in db.exec(
-            select(models.User).where(models.User.id == session.get_user_id())
-        )
-        .first()
-        .unis
+    limit = clamp_limit(limit)
+    statement = list_universities_statement(
+        interested_in(session.get_user_id()), search, limit, skip, cursor
     )
-    uni_link_map = get_unilinks(db)
-    all_universities_plus_interest_field = []
-    for uni in all_universities:
-        uni_plus_interest = uni.dict()
-        if uni_plus_interest["id"] in my_interested_uni_ids:
-            uni_plus_interest["interested"] = True
-        else:
-            uni_plus_interest["interested"] = False
-        uni_plus_interest["link"] = uni_link_map[uni_plus_interest["name"]]
-        all_universities_plus_interest_field.append(uni_plus_interest)
-    return all_universities_plus_interest_field
+    results = await db.exec(statement)
+    universities, next_cursor = next_page(results.all(), limit, "id", cursor)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return universities
 
 
 @router.get("/interested_only", response_model=List[schemas.UniversityResWithLink])
-def get_universities_of_interest(
-    db: Session = Depends(get_db),
+async def get_universities_of_interest(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     session: SessionContainer = Depends(verify_session()),
     limit: int = 10,
     skip: int = 0,
+    cursor: Optional[str] = None,
 ):
-
-    statement = select(models.User).where(models.User.id == session.get_user_id())
-    if limit == -1:
-        statement = statement.offset(skip)
-    else:
-        statement = statement.offset(skip).limit(limit)
-    results = db.exec(statement)
-    uni_link_map = get_unilinks(db)
-    all_universities_plus_interest_field = []
-    for uni in results.first().unis:
-        uni_plus_interest = uni.dict()
-        uni_plus_interest["interested"] = True
-        uni_plus_interest["link"] = uni_link_map[uni_plus_interest["name"]]
-        all_universities_plus_interest_field.append(uni_plus_interest)
-    return all_universities_plus_interest_field
+    limit = clamp_limit(limit)
+    statement = (
+        select_universities_with_link(literal(True))
+        .join(models.UserUniLink, models.UserUniLink.uni_id == models.University.id)
+        .where(models.UserUniLink.user_id == session.get_user_id())
+    )
+    total = await count_async(db, statement)
+    statement = paginate(
+        statement,
+        models.University.id,
+        models.University.id,
+        "id",
+        limit,
+        offset=skip,
+        cursor=cursor,
+    )
+    results = await db.exec(statement)
+    universities, next_cursor = next_page(results.all(), limit, "id", cursor)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    response.headers["Content-Range"] = str(total)
+    return universities
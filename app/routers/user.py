@@ -1,6 +1,5 @@
 import uuid
 
-import boto3
 from fastapi import (
     APIRouter,
     Depends,
@@ -12,13 +11,23 @@ from fastapi import (
 )
 from fastapi_csrf_protect import CsrfProtect
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from supertokens_python.recipe.session import SessionContainer
 from supertokens_python.recipe.session.framework.fastapi import verify_session
 
 from app.config import settings
 
 from .. import models, schemas
-from ..database import get_db
+from ..aws import delete_s3_objects, get_client, object_exists, object_url
+from ..database import get_async_db, get_db
+from ..images import (
+    PHOTO_CONTENT_TYPES,
+    THUMBNAIL_SIZES,
+    create_profile_photo_thumbnails,
+    thumbnail_name,
+)
+from ..loaders import with_loaders
+from ..tasks import enqueue
 
 
 @CsrfProtect.load_config
@@ -31,11 +40,13 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.get("/me", response_model=schemas.UserMe)
 async def get_me(
-    db: Session = Depends(get_db), session: SessionContainer = Depends(verify_session())
+    db: AsyncSession = Depends(get_async_db),
+    session: SessionContainer = Depends(verify_session()),
 ):
     user_id = session.get_user_id()
     statement = select(models.User).where(models.User.id == user_id)
-    results = db.exec(statement)
+    statement = with_loaders(statement, schemas.UserMe)
+    results = await db.exec(statement)
     user = results.first()
     return user
 
@@ -63,8 +74,45 @@ def update_user(
     return user
 
 
+# replaces the user's current photo (in s3 and db) with an uploaded object
+def save_profile_photo(db: Session, current_user: models.User, photo_name: str):
+    # if exists, delete from s3 (with its thumbnails, in the background) and db first
+    if len(current_user.profile_photo) > 0:
+        old_photo_name = current_user.profile_photo[0].photo_name
+        keys = [old_photo_name] + [
+            thumbnail_name(old_photo_name, size) for size in THUMBNAIL_SIZES
+        ]
+        enqueue(delete_s3_objects, db=db, keys=keys)
+        statement = select(models.ProfilePhoto).where(
+            models.ProfilePhoto.photo_url == current_user.profile_photo[0].photo_url
+        )
+        results = db.exec(statement)
+        current_user_profile_photo = results.first()
+        db.delete(current_user_profile_photo)
+        db.commit()
+
+    new_profile_photo = models.ProfilePhoto(
+        owner_id=current_user.id,
+        photo_name=photo_name,
+        photo_url=object_url(photo_name),
+    )
+    new_profile_photo.owner = current_user
+    db.add(new_profile_photo)
+    db.commit()
+    db.refresh(new_profile_photo)
+    return new_profile_photo
+
+
+def check_photo_content_type(content_type: str):
+    if content_type not in PHOTO_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Profile photos must be JPEG, PNG, WebP or GIF images",
+        )
+
+
 @router.post("/profile_photo", status_code=status.HTTP_201_CREATED)
-async def add_photo(
+def add_photo(
     request: Request,
     file: UploadFile,
     db: Session = Depends(get_db),
@@ -73,27 +121,10 @@ async def add_photo(
 ):
     csrf_token = csrf_protect.get_csrf_from_headers(request.headers)
     csrf_protect.validate_csrf(csrf_token, request)
+    check_photo_content_type(file.content_type)
     current_user = db.exec(
         select(models.User).where(models.User.id == session.get_user_id())
     ).first()
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=settings.aws_access_key_id_,
-        aws_secret_access_key=settings.aws_secret_access_key_,
-    )
-
-    # if exists, delete from s3 and db first
-    if len(current_user.profile_photo) > 0:
-        s3.delete_object(
-            Bucket=settings.s3_bucket_name, Key=current_user.profile_photo[0].photo_name
-        )
-        statement = select(models.ProfilePhoto).where(
-            models.ProfilePhoto.photo_url == current_user.profile_photo[0].photo_url
-        )
-        results = db.exec(statement)
-        current_user_profile_photo = results.first()
-        db.delete(current_user_profile_photo)
-        db.commit()
 
     filename = file.filename
     split_file_name = filename.split(".")
@@ -101,35 +132,95 @@ async def add_photo(
         "".join(split_file_name[:-1]) + str(uuid.uuid4()) + "." + split_file_name[-1]
     )
     data = file.file._file
-    s3.upload_fileobj(data, settings.s3_bucket_name, file_name_unique)
-    uploaded_file_url = (
-        f"https://{settings.s3_bucket_name}.s3.amazonaws.com/{file_name_unique}"
-    )
-    new_profile_photo = models.ProfilePhoto(
-        owner_id=session.get_user_id(),
-        photo_name=file_name_unique,
-        photo_url=uploaded_file_url,
-    )
-    new_profile_photo.owner = current_user
-    db.add(new_profile_photo)
+    get_client("s3").upload_fileobj(data, settings.s3_bucket_name, file_name_unique)
+    new_profile_photo = save_profile_photo(db, current_user, file_name_unique)
+    enqueue(create_profile_photo_thumbnails, db=db, photo_id=new_profile_photo.id)
     db.commit()
-    db.refresh(new_profile_photo)
     return new_profile_photo.photo_url
 
 
-@router.get("/profile_photo", status_code=status.HTTP_201_CREATED)
-async def get_photo(
-    db: Session = Depends(get_db), session: SessionContainer = Depends(verify_session())
+# Direct upload: the client POSTs the file to s3 with the returned form, then
+# confirms it, so the image never passes through this service.
+@router.post(
+    "/profile_photo/upload_url",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.ProfilePhotoUploadRes,
+)
+def get_photo_upload_url(
+    request: Request,
+    upload: schemas.ProfilePhotoUploadReq,
+    session: SessionContainer = Depends(verify_session()),
+    csrf_protect: CsrfProtect = Depends(),
 ):
+    csrf_token = csrf_protect.get_csrf_from_headers(request.headers)
+    csrf_protect.validate_csrf(csrf_token, request)
+    check_photo_content_type(upload.content_type)
+    extension = upload.filename.split(".")[-1] if "." in upload.filename else ""
+    photo_name = f"{session.get_user_id()}/{uuid.uuid4()}"
+    if extension != "":
+        photo_name += f".{extension}"
+    presigned_post = get_client("s3").generate_presigned_post(
+        Bucket=settings.s3_bucket_name,
+        Key=photo_name,
+        Fields={"Content-Type": upload.content_type},
+        Conditions=[
+            {"Content-Type": upload.content_type},
+            ["content-length-range", 1, settings.profile_photo_max_bytes],
+        ],
+        ExpiresIn=settings.presigned_url_expiry,
+    )
+    return {
+        "url": presigned_post["url"],
+        "fields": presigned_post["fields"],
+        "photo_name": photo_name,
+    }
 
+
+@router.post("/profile_photo/confirm", status_code=status.HTTP_201_CREATED)
+def confirm_photo_upload(
+    request: Request,
+    upload: schemas.ProfilePhotoConfirmReq,
+    db: Session = Depends(get_db),
+    session: SessionContainer = Depends(verify_session()),
+    csrf_protect: CsrfProtect = Depends(),
+):
+    csrf_token = csrf_protect.get_csrf_from_headers(request.headers)
+    csrf_protect.validate_csrf(csrf_token, request)
+    if not upload.photo_name.startswith(f"{session.get_user_id()}/"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to perform requested action",
+        )
     current_user = db.exec(
         select(models.User).where(models.User.id == session.get_user_id())
     ).first()
-    return (
-        current_user.profile_photo[0].photo_url
-        if len(current_user.profile_photo) > 0
-        else "None"
+    # already confirmed (double click or a retry): replacing it would queue
+    # the deletion of the photo being saved
+    for profile_photo in current_user.profile_photo:
+        if profile_photo.photo_name == upload.photo_name:
+            return profile_photo.photo_url
+    if not object_exists(upload.photo_name):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The uploaded photo does not exist",
+        )
+    new_profile_photo = save_profile_photo(db, current_user, upload.photo_name)
+    enqueue(create_profile_photo_thumbnails, db=db, photo_id=new_profile_photo.id)
+    db.commit()
+    return new_profile_photo.photo_url
+
+
+@router.get("/profile_photo", status_code=status.HTTP_201_CREATED)
+async def get_photo(
+    db: AsyncSession = Depends(get_async_db),
+    session: SessionContainer = Depends(verify_session()),
+):
+    statement = select(models.ProfilePhoto).where(
+        models.ProfilePhoto.owner_id == session.get_user_id()
     )
+    results = await db.exec(statement)
+    profile_photo = results.first()
+    return profile_photo.photo_url if profile_photo != None else "None"
 
 
 @router.post(
@@ -205,13 +296,14 @@ def add_interest_in_uni(
 
 
 @router.get("/public/{user_id}", response_model=schemas.UserRes)
-def get_user(user_id: str, db: Session = Depends(get_db)):
+async def get_user(user_id: str, db: AsyncSession = Depends(get_async_db)):
     statement = (
         select(models.User)
         .where(models.User.id == user_id)
         .where(models.User.public == True)
     )
-    results = db.exec(statement)
+    statement = with_loaders(statement, schemas.UserRes)
+    results = await db.exec(statement)
     user = results.first()
     if user == None:
         raise HTTPException(
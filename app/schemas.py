@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from unicodedata import category
 
 from pydantic import BaseModel
@@ -80,6 +80,10 @@ class UniversityReq(UniversityBase):
     category: str
 
 
+class UniversityImportRow(UniversityReq):
+    link: Optional[str] = None
+
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -100,6 +104,15 @@ class EmailVerify(BaseModel):
     email: str
 
 
+class ProfilePhotoUploadReq(BaseModel):
+    filename: str
+    content_type: str
+
+
+class ProfilePhotoConfirmReq(BaseModel):
+    photo_name: str
+
+
 # Res
 class ExperienceRes(ExperienceBase):
     id: int
@@ -121,9 +134,18 @@ class ProfilePhotoRes(BaseModel):
     id: int
     photo_name: str
     photo_url: str
+    photo_url_small: Optional[str] = None
+    photo_url_medium: Optional[str] = None
+    photo_url_large: Optional[str] = None
     is_deleted: bool
 
 
+class ProfilePhotoUploadRes(BaseModel):
+    url: str
+    fields: Dict[str, str]
+    photo_name: str
+
+
 class UniversityRes(UniversityBase):
     id: int
     name: str
@@ -137,7 +159,7 @@ class UniversityRes(UniversityBase):
 
 
 class UniversityResWithLink(UniversityRes):
-    link: str
+    link: Optional[str] = None
 
 
 class UserRes(UserBase):
@@ -208,3 +230,13 @@ class CsrfSettings(BaseModel):
     cookie_samesite: str = settings.csrf_cookie_samesite
     httponly: bool = settings.csrf_httponly
     cookie_secure: bool = settings.csrf_cookie_secure
+
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class UniversityImportRes(BaseModel):
+    imported: int
+    errors: List[ImportRowError] = []
@@ -0,0 +1,38 @@
+from sqlalchemy import func, literal_column, or_
+
+from . import models
+
+# 'simple' skips stemming and stop words so names match as typed. Inlined as a
+# regconfig literal since asyncpg would otherwise bind it as varchar.
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+
+def _like_pattern(search: str):
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_universities(statement, search: str, rank: bool = True):
+    """Filter a university select statement by a free text search.
+
+    Whole words are matched against the GIN indexed `search_vector` and partial
+    words against the trigram indexed `search_text`, so neither needs a
+    sequential scan of `university`. With `rank`, results are ordered by
+    relevance, best match first.
+    """
+    if search is None or search.strip() == "":
+        return statement
+    search = search.strip()
+    query = func.plainto_tsquery(SEARCH_CONFIG, search)
+    statement = statement.where(
+        or_(
+            models.University.search_vector.op("@@")(query),
+            models.University.search_text.ilike(_like_pattern(search), escape="\\"),
+        )
+    )
+    if rank:
+        statement = statement.order_by(
+            func.ts_rank(models.University.search_vector, query).desc(),
+            models.University.id,
+        )
+    return statement
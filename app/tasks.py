@@ -0,0 +1,180 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from . import models
+from .config import settings
+from .database import engine
+from .metrics import flush_emf
+
+logger = logging.getLogger(__name__)
+
+# a Lambda container is frozen as soon as it responds, so side effects there
+# go through the outbox table instead of threads
+TASK_BACKEND = settings.task_backend or (
+    "outbox" if settings.environment == "PROD" else "thread"
+)
+
+registry = {}
+periodic = []
+_executor = None
+
+
+def task(func):
+    """Register a function so it can be run in the background with `enqueue`."""
+    registry[func.__name__] = func
+    return func
+
+
+def every_drain(func):
+    """Register a function to run at the start of every `drain`.
+
+    For picking up work whose own task gave up, so it isn't left until
+    something happens to queue it again.
+    """
+    periodic.append(func)
+    return func
+
+
+def backoff(attempt: int):
+    return settings.task_retry_backoff * 2 ** (attempt - 1)
+
+
+def enqueue(func, db: Session = None, **kwargs):
+    """Run a registered task outside of the request.
+
+    When `db` is given the task only happens if the caller commits it: with
+    the outbox backend it is written to the task table in `db`'s transaction
+    and run by the next `drain`, with the thread backend it starts in a worker
+    thread once `db` commits. Arguments must be JSON serialisable.
+    """
+    if TASK_BACKEND == "outbox":
+        row = models.Task(name=func.__name__, payload=kwargs)
+        if db is not None:
+            db.add(row)
+            return
+        with Session(engine) as task_db:
+            task_db.add(row)
+            task_db.commit()
+        return
+    if db is not None:
+        event.listen(
+            db,
+            "after_commit",
+            lambda session: _submit(func.__name__, kwargs),
+            once=True,
+        )
+        return
+    _submit(func.__name__, kwargs)
+
+
+def _submit(name: str, kwargs: dict):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.task_workers, thread_name_prefix="task"
+        )
+    _executor.submit(_run_with_retries, name, kwargs)
+
+
+def _run_with_retries(name: str, kwargs: dict):
+    for attempt in range(1, settings.task_max_attempts + 1):
+        try:
+            registry[name](**kwargs)
+            return
+        except Exception:
+            logger.exception("Task %s failed (attempt %s)", name, attempt)
+            if attempt < settings.task_max_attempts:
+                time.sleep(backoff(attempt))
+
+
+def _claim(now: datetime):
+    """Take the next due task, or None.
+
+    The row is locked with SKIP LOCKED only long enough to push its
+    `run_after` a lease ahead, then committed, so no connection is held while
+    the task runs (it may need the only one in the pool). A drain that dies
+    mid task leaves it to be picked up again once the lease runs out.
+    """
+    with Session(engine) as db:
+        row = db.exec(
+            select(models.Task)
+            .where(models.Task.status == "pending")
+            .where(models.Task.run_after <= now)
+            .order_by(models.Task.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if row is None:
+            return None
+        row.attempts += 1
+        row.run_after = now + timedelta(seconds=settings.task_lease)
+        db.add(row)
+        db.commit()
+        return row.id, row.name, row.payload, row.attempts
+
+
+def _finish(task_id: int, attempts: int, error: Exception = None):
+    with Session(engine) as db:
+        row = db.get(models.Task, task_id)
+        if error is None:
+            row.status = "done"
+        else:
+            row.last_error = repr(error)
+            if attempts >= settings.task_max_attempts:
+                row.status = "failed"
+            else:
+                row.run_after = datetime.utcnow() + timedelta(seconds=backoff(attempts))
+        db.add(row)
+        db.commit()
+
+
+def drain(limit: int = None):
+    """Run the outbox tasks that are due, returning how many were run.
+
+    Tasks are claimed one at a time, see `_claim`, so concurrent drains never
+    run the same task at once. Failures are retried with exponential backoff
+    until `task_max_attempts`, then left as "failed".
+    """
+    limit = limit or settings.task_drain_batch_size
+    for func in periodic:
+        try:
+            func()
+        except Exception:
+            logger.exception("Periodic %s failed", func.__name__)
+    now = datetime.utcnow()
+    ran = 0
+    while ran < limit:
+        claimed = _claim(now)
+        if claimed is None:
+            break
+        task_id, name, payload, attempts = claimed
+        try:
+            registry[name](**payload)
+        except Exception as e:
+            logger.exception("Task %s (%s) failed", name, task_id)
+            _finish(task_id, attempts, e)
+        else:
+            _finish(task_id, attempts)
+        ran += 1
+    return ran
+
+
+def main():
+    # importing the task modules registers their tasks
+    from . import aws, images, mailer  # noqa: F401
+
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        ran = drain()
+        flush_emf()  # the aws calls made by the tasks
+        if ran == 0:
+            time.sleep(settings.task_poll_interval)
+
+
+if __name__ == "__main__":
+    main()
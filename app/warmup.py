@@ -0,0 +1,85 @@
+import logging
+import time
+
+from sqlalchemy import literal, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from supertokens_python.async_to_sync_wrapper import sync
+from supertokens_python.normalised_url_path import NormalisedURLPath
+from supertokens_python.querier import Querier
+
+from . import models, schemas
+from .aws import get_client
+from .database import async_engine, engine
+from .loaders import with_loaders
+from .routers.universities import interested_in, list_universities_statement
+
+logger = logging.getLogger(__name__)
+
+
+def is_warmup_event(event):
+    # {"warmup": true} from our schedule, or serverless-plugin-warmup's event
+    return (
+        bool(event.get("warmup")) or event.get("source") == "serverless-plugin-warmup"
+    )
+
+
+def hot_statements():
+    """The statements behind the busiest routes, matching no rows.
+
+    Running them fills the engine's compiled statement cache, which is keyed
+    on the statement's shape rather than its parameters.
+    """
+    return [
+        list_universities_statement(literal(False), "", 10, 0, None),
+        list_universities_statement(interested_in(""), "", 10, 0, None),
+        with_loaders(select(models.User).where(models.User.id == ""), schemas.UserMe),
+        with_loaders(
+            select(models.User)
+            .where(models.User.id == "")
+            .where(models.User.public == True),
+            schemas.UserRes,
+        ),
+    ]
+
+
+async def _ping_supertokens():
+    # the first core request also fetches and caches the core's api version
+    await Querier.get_instance().send_get_request(NormalisedURLPath("/hello"))
+
+
+async def _run_hot_statements():
+    async with AsyncSession(async_engine) as db:
+        for statement in hot_statements():
+            await db.exec(statement)
+
+
+def warm_up():
+    """Do the one-off work of a cold container before real requests arrive.
+
+    Opens the pooled Postgres connection, pings the SuperTokens core, runs
+    the hot statements once and builds the AWS clients. Each step is timed
+    and a failing step is logged rather than raised, so warming never makes
+    the container unusable.
+    """
+    steps = {
+        "database": _ping_database,
+        "supertokens": lambda: sync(_ping_supertokens()),
+        "statements": lambda: sync(_run_hot_statements()),
+        "aws_clients": lambda: [get_client(name) for name in ("s3", "ses")],
+    }
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm up step %s failed", name)
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
+
+
+def _ping_database():
+    # the connection goes back to the pool and is reused by the next request
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
@@ -0,0 +1,77 @@
+"""Profile how long `import app.main` takes, i.e. the Lambda cold start import.
+
+    python scripts/importtime.py               # slowest imports, exit 1 over budget
+    python scripts/importtime.py --budget 900  # with another budget, 0 for none
+
+Runs `python -X importtime` in fresh interpreters, with the same environment
+(settings) as this one, and reports the fastest run to keep noise down.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# app.main took ~1.1s with environment=PROD on a dev machine, leave some room
+DEFAULT_BUDGET_MS = 1500
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile(module: str):
+    """Cumulative import time in microseconds of each module, by name."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            cumulative, depth, name = match.group(2, 3, 4)
+            times[name] = (int(cumulative), len(depth) // 2)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.environ.get("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)),
+        help="fail when the import takes longer than this many milliseconds",
+    )
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda times: times[args.module][0])
+    total_ms = best[args.module][0] / 1000
+
+    # direct dependencies of the module only, nested imports are counted in them
+    print(f"{'ms':>8}  module")
+    top_level = [
+        (cumulative, name)
+        for name, (cumulative, depth) in best.items()
+        if depth == 1 or name == args.module
+    ]
+    for cumulative, name in sorted(top_level, reverse=True)[: args.top]:
+        print(f"{cumulative / 1000:8.1f}  {name}")
+
+    if args.budget and total_ms > args.budget:
+        print(
+            f"import {args.module} took {total_ms:.0f}ms, over the {args.budget:.0f}ms budget"
+        )
+        sys.exit(1)
+    print(f"import {args.module} took {total_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Keeps the Lambda cold start import of app.main within its budget."""
+import os
+import subprocess
+import sys
+import unittest
+
+try:
+    from app.config import settings  # noqa: F401
+except Exception as e:  # settings aren't configured in this environment
+    raise unittest.SkipTest(f"app can't be configured: {e}")
+
+SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "scripts",
+    "importtime.py",
+)
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_app_main_within_budget(self):
+        # as imported on Lambda
+        result = subprocess.run(
+            [sys.executable, SCRIPT, "--top", "0"],
+            env={**os.environ, "environment": "PROD"},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Query counts of the eager loaded profile responses.
+
+Uses the database from the environment's settings, inside a transaction that
+is rolled back, and is skipped when the database can't be reached.
+"""
+import unittest
+from datetime import date
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+try:
+    from app import models, schemas
+    from app.database import engine
+    from app.instrumentation import RequestStats, request_stats
+    from app.loaders import with_loaders
+except Exception as e:  # settings aren't configured in this environment
+    raise unittest.SkipTest(f"app can't be configured: {e}")
+
+
+class ProfileQueryCountTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.connection = engine.connect()
+        except OperationalError as e:
+            self.skipTest(f"database unavailable: {e}")
+        self.transaction = self.connection.begin()
+        self.db = Session(bind=self.connection)
+
+    def tearDown(self):
+        self.db.close()
+        self.transaction.rollback()
+        self.connection.close()
+
+    def add_user(self, user_id: str, related: int):
+        user = models.User(id=user_id, birthday=date(2000, 1, 1))
+        for i in range(related):
+            user.experiences.append(
+                models.Experience(
+                    description=f"experience {i}", start_date=date.today()
+                )
+            )
+            user.educations.append(
+                models.Education(description=f"education {i}", start_date=date.today())
+            )
+            user.unis.append(
+                models.University(
+                    name=f"{user_id} university {i}",
+                    city="city",
+                    state="state",
+                    conference="conference",
+                    division="division",
+                    category="category",
+                    region="region",
+                )
+            )
+        user.profile_photo.append(
+            models.ProfilePhoto(photo_name=user_id, photo_url=f"https://x/{user_id}")
+        )
+        self.db.add(user)
+        self.db.flush()
+        return user_id
+
+    def count_queries(self, statement, schema):
+        self.db.expunge_all()  # load everything from the database again
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            # the joined photo repeats users, so the rows are de-duplicated
+            users = self.db.exec(with_loaders(statement, schema)).unique().all()
+            for user in users:
+                schema.from_orm(user)
+        finally:
+            request_stats.reset(token)
+        return stats.queries
+
+    def test_user_me(self):
+        user_id = self.add_user("query-count-1", related=3)
+        statement = select(models.User).where(models.User.id == user_id)
+        # the user joined with its photo, then one IN query per list
+        self.assertEqual(self.count_queries(statement, schemas.UserMe), 4)
+
+    def test_does_not_grow_with_users_or_rows(self):
+        user_ids = [
+            self.add_user("query-count-1", related=1),
+            self.add_user("query-count-2", related=5),
+        ]
+        statement = select(models.User).where(models.User.id.in_(user_ids))
+        self.assertEqual(self.count_queries(statement, schemas.UserRes), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()